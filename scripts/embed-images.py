@@ -12,27 +12,86 @@ import json
 import os
 import sqlite3
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from itertools import chain, islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import numpy as np
+import open_clip
+import orjson
 import torch
-from elasticsearch import Elasticsearch
+import torch.nn.functional as F
+import xxhash
+from elasticsearch import Elasticsearch, helpers
+from elasticsearch.serializer import JsonSerializer
 from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+from torchvision.io import ImageReadMode, read_image
+from torchvision.transforms import InterpolationMode
+from torchvision.transforms import v2
 from tqdm import tqdm
-from transformers import CLIPModel, CLIPProcessor
+
+# libvips decodes with SIMD and fuses decode+resize+crop; fall back to the
+# torchvision/PIL paths when it (or its shared library) isn't available
+try:
+    import pyvips
+except (ImportError, OSError):
+    pyvips = None
 
 # Configuration
 DEFAULT_ES_URL = "http://localhost:9200"
-DEFAULT_BATCH_SIZE = 50
 STATE_FILE = os.path.expanduser("~/.imessage-mcp/image_state.json")
 MESSAGES_DB = os.path.expanduser("~/Library/Messages/chat.db")
 INDEX_NAME = "imessage_chunks"
 
+# Mapping for the int8 embedding field, applied via put_mapping so indexes
+# created before the field existed don't dynamic-map the arrays as long
+INT8_EMBEDDING_MAPPING = {
+    "image_embedding_int8": {
+        "type": "dense_vector",
+        "dims": 512,  # CLIP ViT-B/32
+        "element_type": "byte",
+        "index": True,
+        "similarity": "cosine",
+    }
+}
+
 # Image file extensions we support
 IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif', '.tiff', '.bmp'}
 
+# How many attachment rows to buffer per DataLoader pass; bounds memory
+# while keeping the decode workers fed
+ATTACHMENT_CHUNK = 4096
+
+# Formats torchvision's native (libjpeg-turbo/libpng) decoders handle.
+# Everything else goes through PIL: HEIC has no torchvision decoder, and
+# gif/webp are excluded because animated GIFs decode to 4-D frame stacks
+# (and their decoders don't exist on older torchvision at all) — PIL gives
+# us the first frame as a plain RGB image
+TORCHVISION_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+
+# Formats worth routing through libvips' fused thumbnail pipeline; HEIC is
+# the dominant iPhone format and Pillow decodes it at full resolution first
+PYVIPS_EXTENSIONS = {'.heic', '.heif', '.jpg', '.jpeg'}
+
+# OpenCLIP model (same weights/embeddings as openai/clip-vit-base-patch32).
+# The -quickgelu arch is required: the OpenAI weights were trained with
+# QuickGELU, and newer open_clip only warns when they're loaded into the
+# plain-GELU ViT-B-32, silently producing different embeddings
+CLIP_ARCH = "ViT-B-32-quickgelu"
+CLIP_PRETRAINED = "openai"
+
+# Weekday names indexed by (days-since-epoch + 3) % 7 (epoch was a Thursday)
+WEEKDAY_NAMES = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# CLIP normalization constants (match openai/clip-vit-base-patch32)
+CLIP_IMAGE_SIZE = 224
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
 
 def load_state() -> dict:
     """Load embedding state from file"""
@@ -49,6 +108,25 @@ def save_state(state: dict):
         json.dump(state, f)
 
 
+def batched(iterable, n: int) -> Iterator[list]:
+    """Yield successive lists of up to n items from an iterable"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, n))
+        if not batch:
+            return
+        yield batch
+
+
+def default_batch_size() -> int:
+    """Pick a batch size that saturates the available device"""
+    if torch.cuda.is_available():
+        return 256
+    if torch.backends.mps.is_available():
+        return 64
+    return 8
+
+
 def mac_to_unix(mac_time: int) -> int:
     """Convert Mac absolute time to Unix timestamp"""
     if mac_time > 1e12:
@@ -56,6 +134,15 @@ def mac_to_unix(mac_time: int) -> int:
     return int(mac_time + 978307200)
 
 
+def content_hash(path: str) -> Optional[str]:
+    """Hash the first 64 KB of a file to identify duplicate attachments"""
+    try:
+        with open(path, 'rb') as f:
+            return xxhash.xxh64_hexdigest(f.read(65536))
+    except OSError:
+        return None
+
+
 def resolve_path(path: str) -> Optional[str]:
     """Resolve macOS attachment path to full path"""
     if not path:
@@ -65,97 +152,277 @@ def resolve_path(path: str) -> Optional[str]:
     return path if os.path.exists(path) else None
 
 
+# Shared decode pool for the path-list embedding API; PIL releases the GIL
+# inside libjpeg, so decodes scale across cores
+_DECODE_POOL = ThreadPoolExecutor(max_workers=min(16, os.cpu_count() or 4))
+
+
+def _open_rgb(path: str) -> Optional[Image.Image]:
+    """Open an image as RGB, returning None on failure"""
+    try:
+        return Image.open(path).convert("RGB")
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return None
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Serialize ES payloads with orjson: C-speed float formatting and
+    native numpy support, so embeddings don't need tolist()"""
+
+    def dumps(self, data) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+class ImagePathDataset(Dataset):
+    """Decodes and preprocesses images inside DataLoader workers so JPEG
+    decode overlaps with GPU embedding of the previous batch.
+
+    Images stay uint8 through resize/crop; normalization to float happens
+    on-device in embed_pixels, so each image crosses the bus as 4x fewer
+    bytes than a float32 tensor would."""
+
+    def __init__(self, paths: list[str]):
+        self.paths = paths
+        self.transform = v2.Compose([
+            v2.Resize(CLIP_IMAGE_SIZE, interpolation=InterpolationMode.BICUBIC, antialias=True),
+            v2.CenterCrop(CLIP_IMAGE_SIZE),
+        ])
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __getitem__(self, idx: int):
+        path = self.paths[idx]
+        try:
+            ext = os.path.splitext(path)[1].lower()
+            if pyvips is not None and ext in PYVIPS_EXTENSIONS:
+                # thumbnail() fuses decode+resize+centre-crop inside libvips,
+                # so HEIC never gets decoded at full resolution
+                thumb = pyvips.Image.thumbnail(path, CLIP_IMAGE_SIZE,
+                                               height=CLIP_IMAGE_SIZE, crop='centre')
+                if thumb.hasalpha():
+                    thumb = thumb.flatten()
+                if thumb.bands == 1:
+                    thumb = thumb.colourspace('srgb')
+                array = np.ndarray(buffer=thumb.write_to_memory(), dtype=np.uint8,
+                                   shape=(thumb.height, thumb.width, thumb.bands))
+                return idx, torch.from_numpy(array).permute(2, 0, 1).contiguous()
+            if ext in TORCHVISION_EXTENSIONS:
+                image = read_image(path, mode=ImageReadMode.RGB)
+            else:
+                pil_image = Image.open(path).convert("RGB")
+                image = torch.from_numpy(np.asarray(pil_image)).permute(2, 0, 1)
+            return idx, self.transform(image)
+        except Exception as e:
+            print(f"Error loading {path}: {e}")
+            return idx, None
+
+
+def collate_pixel_batch(batch):
+    """Stack successfully decoded images, keeping their original indices"""
+    valid = [(idx, pv) for idx, pv in batch if pv is not None]
+    if not valid:
+        return [], None
+    indices = [idx for idx, _ in valid]
+    pixel_values = torch.stack([pv for _, pv in valid])
+    return indices, pixel_values
+
+
 class ImageEmbedder:
-    def __init__(self, device: Optional[str] = None):
+    def __init__(self, device: Optional[str] = None, compile_model: bool = False,
+                 precision: str = "fp16", batch_size: int = 1):
         """Initialize CLIP model and processor"""
-        self.device = device or ("cuda" if torch.cuda.is_available() else 
+        self.device = device or ("cuda" if torch.cuda.is_available() else
                                   "mps" if torch.backends.mps.is_available() else "cpu")
-        
+
+        # Mixed precision only pays off on CUDA tensor cores; autocast on
+        # MPS/CPU is a slowdown, so it stays disabled there.
+        self.autocast_dtype = torch.bfloat16 if precision == "bf16" else torch.float16
+        self.autocast_enabled = precision != "fp32" and self.device == "cuda"
+
+        # CLIP normalization constants, kept on-device so uint8 batches can
+        # be normalized on the GPU instead of the CPU
+        self.mean = torch.tensor(CLIP_MEAN, device=self.device).view(1, 3, 1, 1)
+        self.std = torch.tensor(CLIP_STD, device=self.device).view(1, 3, 1, 1)
+
+        # Largest batch size known to fit in device memory (set on first OOM)
+        self._safe_bs: Optional[int] = None
+
+        # Reusable pinned host buffer so D2H embedding copies run on the
+        # DMA fast path instead of staging through pageable memory (CUDA only)
+        self._host_buf: Optional[torch.Tensor] = None
+
         print(f"Loading CLIP model on {self.device}...")
-        self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+        self.model, _, _ = open_clip.create_model_and_transforms(
+            CLIP_ARCH, pretrained=CLIP_PRETRAINED
+        )
+        self.tokenizer = open_clip.get_tokenizer(CLIP_ARCH)
         self.model.to(self.device)
         self.model.eval()
+
+        if self.device == "cuda":
+            # OpenCLIP attention goes through scaled_dot_product_attention;
+            # make sure the FlashAttention kernel is eligible
+            torch.backends.cuda.enable_flash_sdp(True)
+
+        if compile_model and self.device == "cuda":
+            # Compile the model so Inductor fuses the ViT kernels; all our
+            # inputs are fixed-shape 224x224 batches so the compile cost is
+            # paid once and amortized over thousands of forward passes.
+            print("Compiling CLIP model (one-time warmup, may take a minute)...")
+            self.model = torch.compile(self.model, mode="reduce-overhead", fullgraph=False)
+            # Warm up through the real inference path — same inference_mode +
+            # autocast state and the configured batch size — so Dynamo
+            # captures the graph it will actually run instead of recompiling
+            # on the first real batch
+            dummy = torch.zeros((batch_size, 3, CLIP_IMAGE_SIZE, CLIP_IMAGE_SIZE),
+                                dtype=torch.uint8)
+            self.embed_pixels(dummy)
+            print("Compilation warmup done")
+
         print("CLIP model loaded successfully")
-    
+
+    def _autocast(self):
+        """Autocast context for the CLIP forward pass"""
+        return torch.autocast(
+            device_type="cuda" if self.device == "cuda" else "cpu",
+            dtype=self.autocast_dtype,
+            enabled=self.autocast_enabled,
+        )
+
     def embed_image(self, image_path: str) -> Optional[np.ndarray]:
         """Generate embedding for a single image"""
         try:
             image = Image.open(image_path).convert("RGB")
-            inputs = self.processor(images=image, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                image_features = self.model.get_image_features(**inputs)
-                # Normalize the embedding
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-            
-            return image_features.cpu().numpy().flatten()
+            embeddings = self.embed_pixels(self._fast_preprocess([image]))
+            return embeddings[0] if embeddings is not None else None
         except Exception as e:
             print(f"Error embedding {image_path}: {e}")
             return None
-    
+
     def embed_text(self, text: str) -> Optional[np.ndarray]:
         """Generate embedding for text (for text-to-image search)"""
         try:
-            inputs = self.processor(text=[text], return_tensors="pt", padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                text_features = self.model.get_text_features(**inputs)
-                text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-            
-            return text_features.cpu().numpy().flatten()
+            tokens = self.tokenizer([text]).to(self.device)
+
+            with torch.inference_mode(), self._autocast():
+                text_features = self.model.encode_text(tokens)
+                text_features = F.normalize(text_features.float(), dim=-1, eps=1e-8)
+
+            # Output is already (1, D); index instead of flattening a copy
+            return text_features.cpu().numpy()[0]
         except Exception as e:
             print(f"Error embedding text: {e}")
             return None
     
+    def _fast_preprocess(self, images: list[Image.Image]) -> torch.Tensor:
+        """Specialized replacement for the stock preprocess transform.
+
+        Every input becomes a 224x224 RGB crop, so the generic transform
+        dispatch is replaced with a hard-coded bicubic resize + center crop
+        and one batched numpy conversion; normalization happens on-device
+        in _forward."""
+        arrays = np.empty((len(images), CLIP_IMAGE_SIZE, CLIP_IMAGE_SIZE, 3), dtype=np.uint8)
+        for i, image in enumerate(images):
+            width, height = image.size
+            scale = CLIP_IMAGE_SIZE / min(width, height)
+            resized = image.resize((round(width * scale), round(height * scale)), Image.BICUBIC)
+            left = (resized.width - CLIP_IMAGE_SIZE) // 2
+            top = (resized.height - CLIP_IMAGE_SIZE) // 2
+            cropped = resized.crop((left, top, left + CLIP_IMAGE_SIZE, top + CLIP_IMAGE_SIZE))
+            arrays[i] = np.asarray(cropped)
+        return torch.from_numpy(arrays).permute(0, 3, 1, 2).contiguous()
+
+    def _forward(self, pixel_values: torch.Tensor) -> np.ndarray:
+        """Run the CLIP image forward on one on-device chunk"""
+        pixel_values = pixel_values.to(self.device, non_blocking=True)
+        if pixel_values.dtype == torch.uint8:
+            pixel_values = (pixel_values.float().div_(255) - self.mean) / self.std
+
+        with torch.inference_mode(), self._autocast():
+            image_features = self.model.encode_image(pixel_values)
+            # F.normalize is a single fused kernel (and zero-norm safe),
+            # unlike the div-by-norm pattern which allocates intermediates
+            image_features = F.normalize(image_features.float(), dim=-1, eps=1e-8)
+
+        if self.device == "cuda":
+            return self._to_host(image_features)
+        return image_features.cpu().numpy()
+
+    def _to_host(self, image_features: torch.Tensor) -> np.ndarray:
+        """Copy embeddings off-device through a reusable pinned buffer,
+        avoiding the pageable staging copy a plain .cpu() would do"""
+        n = image_features.shape[0]
+        if self._host_buf is None or self._host_buf.shape[0] < n:
+            self._host_buf = torch.empty((n, image_features.shape[1]),
+                                         dtype=torch.float32, pin_memory=True)
+        self._host_buf[:n].copy_(image_features)
+        # The buffer is reused across batches, so hand back a copy
+        return self._host_buf[:n].numpy().copy()
+
+    def embed_pixels(self, pixel_values: torch.Tensor) -> Optional[np.ndarray]:
+        """Generate embeddings for a preprocessed (N, 3, 224, 224) batch.
+
+        On CUDA OOM the batch is halved and retried; the working size is
+        remembered so later batches are chunked up front instead of
+        re-triggering the OOM."""
+        try:
+            chunk = self._safe_bs or len(pixel_values)
+            while True:
+                try:
+                    if chunk >= len(pixel_values):
+                        return self._forward(pixel_values)
+                    return np.concatenate([
+                        self._forward(pixel_values[i:i + chunk])
+                        for i in range(0, len(pixel_values), chunk)
+                    ])
+                except torch.cuda.OutOfMemoryError:
+                    if chunk <= 1:
+                        raise
+                    torch.cuda.empty_cache()
+                    chunk = max(1, chunk // 2)
+                    self._safe_bs = chunk
+                    print(f"CUDA out of memory, retrying with batch size {chunk}")
+        except Exception as e:
+            print(f"Error in batch embedding: {e}")
+            return None
+
     def embed_batch(self, image_paths: list[str]) -> list[Optional[np.ndarray]]:
         """Generate embeddings for a batch of images"""
-        results = []
-        images = []
-        valid_indices = []
-        
-        for i, path in enumerate(image_paths):
-            try:
-                image = Image.open(path).convert("RGB")
-                images.append(image)
-                valid_indices.append(i)
-            except Exception as e:
-                print(f"Error loading {path}: {e}")
-        
+        raw = list(_DECODE_POOL.map(_open_rgb, image_paths))
+        valid_indices = [i for i, image in enumerate(raw) if image is not None]
+        images = [raw[i] for i in valid_indices]
+
         if not images:
             return [None] * len(image_paths)
-        
-        try:
-            inputs = self.processor(images=images, return_tensors="pt", padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                image_features = self.model.get_image_features(**inputs)
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-            
-            embeddings = image_features.cpu().numpy()
-            
-            # Map back to original indices
-            result = [None] * len(image_paths)
-            for idx, embedding in zip(valid_indices, embeddings):
-                result[idx] = embedding.flatten()
-            
-            return result
-        except Exception as e:
-            print(f"Error in batch embedding: {e}")
+
+        embeddings = self.embed_pixels(self._fast_preprocess(images))
+        if embeddings is None:
             return [None] * len(image_paths)
 
+        # Map back to original indices
+        result = [None] * len(image_paths)
+        for idx, embedding in zip(valid_indices, embeddings):
+            result[idx] = embedding.flatten()
+
+        return result
 
-def get_image_attachments(db_path: str, since_rowid: int = 0, limit: Optional[int] = None) -> list[dict]:
-    """Read image attachments from Messages database"""
+
+def get_image_attachments(db_path: str, since_rowid: int = 0, limit: Optional[int] = None) -> Iterator[dict]:
+    """Stream image attachments from Messages database, ordered by rowid"""
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    # chat.db is read-only for us, so mmap IO and a 64 MB page cache are safe
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
     cursor = conn.cursor()
-    
+
+    # Filter on mime_type only; the old chain of trailing-wildcard
+    # filename LIKEs forced a full scan of every row. The rare rows with a
+    # NULL mime_type get an extension check in Python below.
     query = """
-        SELECT 
+        SELECT
             a.ROWID as rowid,
             a.guid,
             a.filename,
@@ -172,130 +439,181 @@ def get_image_attachments(db_path: str, since_rowid: int = 0, limit: Optional[in
         LEFT JOIN chat c ON cmj.chat_id = c.ROWID
         WHERE a.filename IS NOT NULL
           AND a.ROWID > ?
-          AND (
-            a.mime_type LIKE 'image/%'
-            OR a.filename LIKE '%.jpg'
-            OR a.filename LIKE '%.jpeg'
-            OR a.filename LIKE '%.png'
-            OR a.filename LIKE '%.gif'
-            OR a.filename LIKE '%.heic'
-            OR a.filename LIKE '%.heif'
-            OR a.filename LIKE '%.webp'
-            OR a.filename LIKE '%.tiff'
-            OR a.filename LIKE '%.bmp'
-          )
+          AND (a.mime_type LIKE 'image/%' OR a.mime_type IS NULL)
         ORDER BY a.ROWID ASC
     """
-    
+
     if limit:
         query += f" LIMIT {limit}"
-    
-    cursor.execute(query, (since_rowid,))
-    
-    attachments = []
-    for row in cursor.fetchall():
-        path = resolve_path(row['filename'])
-        if path:
-            attachments.append({
-                'rowid': row['rowid'],
-                'guid': row['guid'],
-                'filename': path,
-                'mime_type': row['mime_type'] or 'image/jpeg',
-                'message_rowid': row['message_rowid'],
-                'chat_identifier': row['chat_identifier'],
-                'created_at': mac_to_unix(row['created_date']) if row['created_date'] else 0,
-                'transfer_name': row['transfer_name'],
-                'total_bytes': row['total_bytes'] or 0,
-            })
-    
-    conn.close()
-    return attachments
 
+    try:
+        cursor.execute(query, (since_rowid,))
+
+        while True:
+            rows = cursor.fetchmany(10000)
+            if not rows:
+                break
+            for row in rows:
+                if not row['mime_type']:
+                    ext = os.path.splitext(row['filename'])[1].lower()
+                    if ext not in IMAGE_EXTENSIONS:
+                        continue
+                path = resolve_path(row['filename'])
+                if not path:
+                    continue
+                file_hash = content_hash(path)
+                if file_hash:
+                    yield {
+                        'rowid': row['rowid'],
+                        'guid': row['guid'],
+                        'content_hash': file_hash,
+                        'filename': path,
+                        'mime_type': row['mime_type'] or 'image/jpeg',
+                        'message_rowid': row['message_rowid'],
+                        'chat_identifier': row['chat_identifier'],
+                        'created_at': mac_to_unix(row['created_date']) if row['created_date'] else 0,
+                        'transfer_name': row['transfer_name'],
+                        'total_bytes': row['total_bytes'] or 0,
+                    }
+    finally:
+        conn.close()
 
-def update_elasticsearch_with_embeddings(es: Elasticsearch, attachments: list[dict], embeddings: list[Optional[np.ndarray]]):
+
+def quantize_embedding(embedding: np.ndarray) -> np.ndarray:
+    """Quantize a unit-norm embedding to int8 for a byte dense_vector.
+
+    Post-normalization CLIP components lie in [-1, 1], so scaling by 127
+    costs <1% recall while cutting index size and search bandwidth 4x.
+    Returned as a numpy array; the orjson serializer handles it natively."""
+    return np.clip(np.round(embedding * 127), -128, 127).astype(np.int8)
+
+
+def update_elasticsearch_with_embeddings(es: Elasticsearch, attachments: list[dict],
+                                         embeddings: list[Optional[np.ndarray]],
+                                         keep_fp32: bool = False):
     """Update Elasticsearch documents with image embeddings"""
-    operations = []
-    
-    for attachment, embedding in zip(attachments, embeddings):
-        if embedding is None:
-            continue
-        
-        # We need to find the document by message_rowid or create a new image document
-        # For now, we'll create/update image-specific documents
-        doc_id = f"img_{attachment['guid']}"
-        
-        doc = {
-            "doc": {
+    def actions():
+        for attachment, embedding in zip(attachments, embeddings):
+            if embedding is None:
+                continue
+
+            # We need to find the document by message_rowid or create a new image document
+            # For now, we'll create/update image-specific documents
+            fields = {
                 "has_image": True,
-                "image_embedding": embedding.tolist(),
-            },
-            "doc_as_upsert": True
-        }
-        
-        operations.append({"update": {"_index": INDEX_NAME, "_id": doc_id}})
-        operations.append(doc)
-    
-    if operations:
-        try:
-            es.bulk(operations=operations, refresh=True)
-        except Exception as e:
-            print(f"Error updating Elasticsearch: {e}")
+                "image_embedding_int8": quantize_embedding(embedding),
+            }
+            if keep_fp32:
+                fields["image_embedding"] = embedding.astype(np.float32)
+
+            yield {
+                "_op_type": "update",
+                "_index": INDEX_NAME,
+                "_id": f"img_{attachment['content_hash']}",
+                "doc": fields,
+                "doc_as_upsert": True,
+            }
+
+    try:
+        helpers.bulk(es, actions(), chunk_size=500, request_timeout=60, refresh=False)
+    except Exception as e:
+        print(f"Error updating Elasticsearch: {e}")
 
 
-def create_image_documents(es: Elasticsearch, attachments: list[dict], embeddings: list[Optional[np.ndarray]]):
+def create_image_documents(es: Elasticsearch, attachments: list[dict],
+                           embeddings: list[Optional[np.ndarray]],
+                           keep_fp32: bool = False):
     """Create new Elasticsearch documents for images with their embeddings"""
-    operations = []
-    
-    for attachment, embedding in zip(attachments, embeddings):
-        if embedding is None:
-            continue
-        
-        doc_id = f"img_{attachment['guid']}"
-        timestamp = datetime.fromtimestamp(attachment['created_at'])
-        
-        doc = {
-            "text": f"[Image: {attachment['transfer_name'] or 'attachment'}]",
-            "image_embedding": embedding.tolist(),
-            "sender": "Unknown",  # Will be enriched later
-            "sender_is_me": False,
-            "participants": [],
-            "participant_count": 0,
-            "chat_id": attachment['chat_identifier'] or "unknown",
-            "chat_name": None,
-            "is_dm": True,
-            "is_group_chat": False,
-            "timestamp": timestamp.isoformat(),
-            "year": timestamp.year,
-            "month": timestamp.month,
-            "day_of_week": timestamp.strftime("%A").lower(),
-            "hour_of_day": timestamp.hour,
-            "has_attachment": True,
-            "has_image": True,
-            "chunk_id": doc_id,
-            "message_count": 1,
-            "start_timestamp": timestamp.isoformat(),
-            "end_timestamp": timestamp.isoformat(),
-        }
-        
-        operations.append({"index": {"_index": INDEX_NAME, "_id": doc_id}})
-        operations.append(doc)
-    
-    if operations:
-        try:
-            result = es.bulk(operations=operations, refresh=True)
-            if result.get('errors'):
-                print(f"Some documents had errors during indexing")
-        except Exception as e:
-            print(f"Error indexing to Elasticsearch: {e}")
+    # Derive the temporal fields for the whole batch in one vectorized pass
+    # instead of constructing a datetime per document. The local UTC offset
+    # varies across the corpus (DST), so resolve it per unique day and shift
+    # the epoch seconds before casting; this matches the per-timestamp
+    # local-time fields the TypeScript indexer writes for message chunks
+    raw = np.array([a['created_at'] for a in attachments], dtype=np.int64)
+    days, day_index = np.unique(raw // 86400, return_inverse=True)
+    offsets = np.array([time.localtime(int(day) * 86400).tm_gmtoff for day in days],
+                       dtype=np.int64)
+    ts = (raw + offsets[day_index]).astype('datetime64[s]')
+    iso_strings = np.datetime_as_string(ts, unit='s')
+    years = ts.astype('datetime64[Y]').astype(int) + 1970
+    months = ts.astype('datetime64[M]').astype(int) % 12 + 1
+    hours = ts.astype('datetime64[h]').astype(int) % 24
+    weekdays = (ts.astype('datetime64[D]').astype(int) + 3) % 7
+
+    def actions():
+        for i, (attachment, embedding) in enumerate(zip(attachments, embeddings)):
+            if embedding is None:
+                continue
+
+            doc_id = f"img_{attachment['content_hash']}"
+            timestamp = str(iso_strings[i])
+
+            doc = {
+                "text": f"[Image: {attachment['transfer_name'] or 'attachment'}]",
+                "image_embedding_int8": quantize_embedding(embedding),
+                "sender": "Unknown",  # Will be enriched later
+                "sender_is_me": False,
+                "participants": [],
+                "participant_count": 0,
+                "chat_id": attachment['chat_identifier'] or "unknown",
+                "chat_name": None,
+                "is_dm": True,
+                "is_group_chat": False,
+                "timestamp": timestamp,
+                "year": int(years[i]),
+                "month": int(months[i]),
+                "day_of_week": WEEKDAY_NAMES[int(weekdays[i])],
+                "hour_of_day": int(hours[i]),
+                "has_attachment": True,
+                "has_image": True,
+                "chunk_id": doc_id,
+                "message_count": 1,
+                "start_timestamp": timestamp,
+                "end_timestamp": timestamp,
+            }
+            if keep_fp32:
+                doc["image_embedding"] = embedding.astype(np.float32)
+
+            yield {"_op_type": "index", "_index": INDEX_NAME, "_id": doc_id, "_source": doc}
+
+    try:
+        # refresh is deferred to one indices.refresh at the end of the
+        # run; per-bulk refresh forces a Lucene segment flush every batch
+        helpers.bulk(es, actions(), chunk_size=500, request_timeout=60, refresh=False)
+    except Exception as e:
+        print(f"Error indexing to Elasticsearch: {e}")
+
+
+def get_existing_image_ids(es: Elasticsearch) -> set[str]:
+    """Collect the ids of image documents already in the index"""
+    existing = set()
+    try:
+        resp = es.search(index=INDEX_NAME, query={"term": {"has_image": True}},
+                         _source=False, size=10000, scroll='2m')
+        while True:
+            hits = resp['hits']['hits']
+            if not hits:
+                break
+            existing.update(hit['_id'] for hit in hits)
+            resp = es.scroll(scroll_id=resp['_scroll_id'], scroll='2m')
+    except Exception as e:
+        print(f"Warning: could not fetch existing image ids: {e}")
+    return existing
 
 
 def main():
     parser = argparse.ArgumentParser(description="Generate CLIP embeddings for iMessage images")
     parser.add_argument("--full", action="store_true", help="Full reindex (ignore previous state)")
-    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Batch size for embedding")
+    parser.add_argument("--batch-size", type=int, default=default_batch_size(),
+                        help="Batch size for embedding (default adapts to device)")
     parser.add_argument("--es-url", default=DEFAULT_ES_URL, help="Elasticsearch URL")
     parser.add_argument("--limit", type=int, help="Maximum number of images to process")
     parser.add_argument("--dry-run", action="store_true", help="Don't actually update Elasticsearch")
+    parser.add_argument("--compile", action="store_true", help="torch.compile the CLIP model (CUDA only)")
+    parser.add_argument("--precision", choices=["fp32", "fp16", "bf16"], default="fp16",
+                        help="Autocast precision for the CLIP forward (CUDA only)")
+    parser.add_argument("--keep-fp32", action="store_true",
+                        help="Also store the float32 embedding alongside the int8 one")
     args = parser.parse_args()
     
     # Check if Messages database exists
@@ -305,12 +623,18 @@ def main():
     
     # Connect to Elasticsearch
     if not args.dry_run:
-        es = Elasticsearch(args.es_url)
+        es = Elasticsearch(args.es_url, serializer=OrjsonSerializer(), http_compress=True)
         if not es.ping():
             print(f"Error: Cannot connect to Elasticsearch at {args.es_url}")
             print("Run: pnpm es:start")
             sys.exit(1)
         print(f"Connected to Elasticsearch at {args.es_url}")
+        # Make sure the int8 field is mapped before any docs land in an
+        # index created before the field existed
+        try:
+            es.indices.put_mapping(index=INDEX_NAME, properties=INT8_EMBEDDING_MAPPING)
+        except Exception as e:
+            print(f"Warning: could not update index mapping: {e}")
     else:
         es = None
         print("Dry run mode - not updating Elasticsearch")
@@ -324,39 +648,89 @@ def main():
     print(f"{'='*50}")
     print(f"Starting from attachment rowid: {since_rowid}")
     
-    # Get attachments
+    # Stream attachments so the first batch embeds before SQL is drained and
+    # memory stays bounded regardless of corpus size
     print("\nReading image attachments from Messages database...")
-    attachments = get_image_attachments(MESSAGES_DB, since_rowid, args.limit)
-    
-    if not attachments:
+    attachment_stream = get_image_attachments(MESSAGES_DB, since_rowid, args.limit)
+    chunks = batched(attachment_stream, ATTACHMENT_CHUNK)
+
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
         print("No new images to embed")
         return
-    
-    print(f"Found {len(attachments)} images to embed")
-    
+
+    # Content hashes that are already indexed (or queued this run); forwarded
+    # memes and re-saved screenshots are common, so this skips real work.
+    # A --full run re-embeds everything, so it only dedupes within the run
+    seen_ids = get_existing_image_ids(es) if es and not args.full else set()
+    if seen_ids:
+        print(f"Found {len(seen_ids)} already-indexed images")
+
     # Initialize embedder
-    embedder = ImageEmbedder()
-    
-    # Process in batches
+    embedder = ImageEmbedder(compile_model=args.compile, precision=args.precision,
+                             batch_size=args.batch_size)
+
+    # Process in batches; ES uploads run on a small thread pool so the GPU
+    # is already embedding the next batch while the previous one is indexed
+    total_images = 0
     total_embedded = 0
+    total_duplicates = 0
     max_rowid = since_rowid
-    
-    for i in tqdm(range(0, len(attachments), args.batch_size), desc="Embedding batches"):
-        batch = attachments[i:i + args.batch_size]
-        image_paths = [a['filename'] for a in batch]
-        
-        embeddings = embedder.embed_batch(image_paths)
-        
-        # Count successful embeddings
-        successful = sum(1 for e in embeddings if e is not None)
-        total_embedded += successful
-        
-        # Update max rowid
-        max_rowid = max(max_rowid, max(a['rowid'] for a in batch))
-        
-        # Store in Elasticsearch
-        if not args.dry_run and es:
-            create_image_documents(es, batch, embeddings)
+    num_workers = min(8, (os.cpu_count() or 2) // 2)
+    upload_executor = ThreadPoolExecutor(max_workers=2)
+    upload_futures = []
+
+    for chunk in chain([first_chunk], chunks):
+        total_images += len(chunk)
+        # Chunks arrive ordered by rowid, so the last row is the high-water mark
+        max_rowid = max(max_rowid, chunk[-1]['rowid'])
+
+        # Skip attachments whose content we've already embedded
+        fresh = []
+        for attachment in chunk:
+            doc_id = f"img_{attachment['content_hash']}"
+            if doc_id in seen_ids:
+                total_duplicates += 1
+                continue
+            seen_ids.add(doc_id)
+            fresh.append(attachment)
+        chunk = fresh
+        if not chunk:
+            continue
+
+        # Decode/preprocess in worker processes so the GPU never waits on PIL
+        dataset = ImagePathDataset([a['filename'] for a in chunk])
+        loader = DataLoader(
+            dataset,
+            batch_size=args.batch_size,
+            num_workers=num_workers,
+            pin_memory=(embedder.device == "cuda"),
+            prefetch_factor=4 if num_workers > 0 else None,
+            collate_fn=collate_pixel_batch,
+        )
+
+        for indices, pixel_values in tqdm(loader, desc="Embedding batches", leave=False):
+            if pixel_values is None:
+                continue
+
+            embeddings = embedder.embed_pixels(pixel_values)
+            if embeddings is None:
+                continue
+
+            batch = [chunk[i] for i in indices]
+            total_embedded += len(batch)
+
+            # Store in Elasticsearch
+            if not args.dry_run and es:
+                upload_futures.append(
+                    upload_executor.submit(create_image_documents, es, batch, list(embeddings),
+                                           args.keep_fp32)
+                )
+
+    wait(upload_futures)
+    upload_executor.shutdown()
+    if not args.dry_run and es:
+        es.indices.refresh(index=INDEX_NAME)
     
     # Update state
     new_state = {
@@ -369,7 +743,8 @@ def main():
     print(f"\n{'='*50}")
     print("Embedding Complete!")
     print(f"{'='*50}")
-    print(f"Images processed: {len(attachments)}")
+    print(f"Images processed: {total_images}")
+    print(f"Duplicates skipped: {total_duplicates}")
     print(f"Successfully embedded: {total_embedded}")
     print(f"Last attachment rowid: {max_rowid}")
     print(f"Total images embedded (all time): {new_state['total_images_embedded']}")
@@ -60,6 +60,7 @@ export interface MessageDocument {
   has_attachment: boolean;
   has_image: boolean;
   image_embedding?: number[];
+  image_embedding_int8?: number[];
   
   // Chunk metadata
   chunk_id: string;
@@ -208,6 +209,14 @@ const INDEX_MAPPING = {
       image_embedding: {
         type: 'dense_vector' as const,
         dims: IMAGE_EMBEDDING_DIMS,
+        element_type: 'float' as const,
+        index: true,
+        similarity: 'cosine' as const
+      },
+      image_embedding_int8: {
+        type: 'dense_vector' as const,
+        dims: IMAGE_EMBEDDING_DIMS,
+        element_type: 'byte' as const,
         index: true,
         similarity: 'cosine' as const
       },
@@ -239,6 +248,19 @@ export const PEOPLE_GRAPH_FIELDS_MAPPING = {
   participant_handles: { type: 'keyword' as const },
 };
 
+/**
+ * Int8 image embedding field for migration (to add to existing index)
+ */
+export const IMAGE_INT8_FIELDS_MAPPING = {
+  image_embedding_int8: {
+    type: 'dense_vector' as const,
+    dims: IMAGE_EMBEDDING_DIMS,
+    element_type: 'byte' as const,
+    index: true,
+    similarity: 'cosine' as const
+  },
+};
+
 /**
  * Elasticsearch client wrapper for iMessage search
  */
@@ -387,7 +409,7 @@ export class ElasticsearchDB {
       query,
       size: limit,
       from: offset,
-      _source: { excludes: ['text_embedding', 'image_embedding'] }  // Don't return vectors
+      _source: { excludes: ['text_embedding', 'image_embedding', 'image_embedding_int8'] }  // Don't return vectors
     });
     
     return response.hits.hits.map(hit => ({
@@ -427,6 +449,15 @@ export class ElasticsearchDB {
     });
   }
   
+  /**
+   * Quantize a unit-norm embedding to int8, matching the storage
+   * quantization the embedding pipeline uses for image_embedding_int8.
+   * Used for kNN queries and by write paths that populate the int8 field.
+   */
+  quantizeEmbedding(embedding: number[]): number[] {
+    return embedding.map(v => Math.max(-128, Math.min(127, Math.round(v * 127))));
+  }
+
   /**
    * Image search using CLIP embeddings
    */
@@ -436,22 +467,30 @@ export class ElasticsearchDB {
     filters?: SearchFilters
   ): Promise<SearchResult[]> {
     await this.initialize();
-    
+
     const filterClauses = this.buildFilterClauses({ ...filters, has_image: true });
-    
-    const response = await this.client.search({
-      index: INDEX_NAME,
-      knn: {
-        field: 'image_embedding',
-        query_vector: imageEmbedding,
-        k: limit,
-        num_candidates: limit * 10,
-        filter: filterClauses.length > 0 ? { bool: { filter: filterClauses } } : undefined
-      },
-      size: limit,
-      _source: { excludes: ['text_embedding', 'image_embedding'] }
-    });
-    
+
+    const knnSearch = (field: string, queryVector: number[]) =>
+      this.client.search({
+        index: INDEX_NAME,
+        knn: {
+          field,
+          query_vector: queryVector,
+          k: limit,
+          num_candidates: limit * 10,
+          filter: filterClauses.length > 0 ? { bool: { filter: filterClauses } } : undefined
+        },
+        size: limit,
+        _source: { excludes: ['text_embedding', 'image_embedding', 'image_embedding_int8'] }
+      });
+
+    // New image docs only carry the int8 vector; fall back to the float
+    // field for docs indexed before quantization
+    let response = await knnSearch('image_embedding_int8', this.quantizeEmbedding(imageEmbedding));
+    if (response.hits.hits.length === 0) {
+      response = await knnSearch('image_embedding', imageEmbedding);
+    }
+
     return response.hits.hits.map(hit => ({
       id: hit._id!,
       score: hit._score || 0,
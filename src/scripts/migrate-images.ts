@@ -8,7 +8,7 @@
 
 import 'dotenv/config';
 import { existsSync } from 'fs';
-import { getElasticsearchDB } from '../db/elasticsearch.js';
+import { getElasticsearchDB, IMAGE_INT8_FIELDS_MAPPING } from '../db/elasticsearch.js';
 import { getImageReader } from '../indexer/images.js';
 import { getCLIPClient, preloadCLIPModel } from '../embeddings/clip.js';
 import { getStateManager } from '../indexer/state.js';
@@ -45,6 +45,14 @@ async function migrate(options: MigrationOptions) {
     throw new Error('Elasticsearch is not reachable. Run `pnpm es:start` first.');
   }
   
+  // Add the int8 embedding field to indexes created before it existed;
+  // otherwise dynamic mapping turns it into longs, which aren't kNN-searchable
+  try {
+    await esDB.updateMapping(IMAGE_INT8_FIELDS_MAPPING);
+  } catch (err) {
+    log('Migration', `ES mapping update failed (may already exist): ${err}`, 'warn');
+  }
+
   // Get ES stats
   const stats = await esDB.getStats();
   if (!stats || stats.documentCount === 0) {
@@ -150,11 +158,13 @@ async function migrate(options: MigrationOptions) {
         const embedding = await clipClient.embedImage(chunk.imagePaths[0]);
         
         if (embedding) {
-          // Update the document in Elasticsearch
+          // Update the document in Elasticsearch; write the int8 field too
+          // since imageSearch runs kNN against it
           await updateDocument(esDB, chunk.chunkId, {
             has_image: true,
             has_attachment: true,
             image_embedding: embedding,
+            image_embedding_int8: esDB.quantizeEmbedding(embedding),
           });
           updated++;
         } else {
@@ -203,6 +213,7 @@ async function updateDocument(
     has_image?: boolean;
     has_attachment?: boolean;
     image_embedding?: number[];
+    image_embedding_int8?: number[];
   }
 ) {
   // Access the underlying ES client through the public interface
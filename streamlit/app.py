@@ -4,6 +4,7 @@ Run with: streamlit run dashboard/app.py
 """
 
 import os
+import re
 import streamlit as st
 from datetime import datetime, timedelta
 from qdrant_client import QdrantClient
@@ -18,6 +19,11 @@ QDRANT_URL = os.getenv('QDRANT_URL', 'http://localhost:6333')
 COLLECTION_NAME = 'imessage_chunks'
 EMBEDDING_MODEL = 'text-embedding-3-small'
 
+# Precompiled prefix matchers for message coloring: one C-level regex pass
+# over the whole chunk instead of a Python loop per line on every rerun
+_ME_RE = re.compile(r'^\[Me ', re.M)
+_OTHER_RE = re.compile(r'^\[(?!Me )', re.M)
+
 # Initialize clients
 @st.cache_resource
 def get_clients():
@@ -25,6 +31,32 @@ def get_clients():
     openai = OpenAI()
     return qdrant, openai
 
+# Cache query embeddings so reruns (slider drags, filter tweaks) don't
+# re-pay OpenAI latency and cost for the same query string
+@st.cache_data(show_spinner=False, max_entries=512)
+def embed_query(query: str) -> list[float]:
+    _, openai_client = get_clients()
+    response = openai_client.embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=query,
+        dimensions=1536
+    )
+    return response.data[0].embedding
+
+# Cache search results briefly so interacting with result cards doesn't
+# re-hit Qdrant for the same (query, filter, count) triple
+@st.cache_data(ttl=60, show_spinner=False)
+def run_search(query: str, search_filter, result_count: int):
+    qdrant, _ = get_clients()
+    search_result = qdrant.query_points(
+        collection_name=COLLECTION_NAME,
+        query=embed_query(query),
+        limit=result_count,
+        query_filter=search_filter,
+        with_payload=True
+    )
+    return search_result.points
+
 # Page config
 st.set_page_config(
     page_title="iMessage Search",
@@ -119,14 +151,6 @@ query = st.text_input(
 if query:
     with st.spinner("Searching..."):
         try:
-            # Generate embedding for query
-            embedding_response = openai_client.embeddings.create(
-                model=EMBEDDING_MODEL,
-                input=query,
-                dimensions=1536
-            )
-            query_vector = embedding_response.data[0].embedding
-            
             # Build filters
             filter_conditions = []
             
@@ -150,15 +174,8 @@ if query:
             
             search_filter = {"must": filter_conditions} if filter_conditions else None
             
-            # Search Qdrant
-            search_result = qdrant.query_points(
-                collection_name=COLLECTION_NAME,
-                query=query_vector,
-                limit=result_count,
-                query_filter=search_filter,
-                with_payload=True
-            )
-            results = search_result.points
+            # Search Qdrant (embedding + query are cached across reruns)
+            results = run_search(query, search_filter, result_count)
             
             if not results:
                 st.info("No results found. Try a different query or adjust filters.")
@@ -211,17 +228,8 @@ if query:
                         message_text = payload.get('text', '')
                         
                         # Color code the messages
-                        lines = message_text.split('\n')
-                        formatted_lines = []
-                        for line in lines:
-                            if line.startswith('[Me '):
-                                formatted_lines.append(f"🟢 {line}")
-                            elif line.startswith('['):
-                                formatted_lines.append(f"🔵 {line}")
-                            else:
-                                formatted_lines.append(line)
-                        
-                        st.code('\n'.join(formatted_lines), language=None)
+                        formatted = _OTHER_RE.sub('🔵 [', _ME_RE.sub('🟢 [Me ', message_text))
+                        st.code(formatted, language=None)
                         st.divider()
                         
         except Exception as e:
@@ -3,6 +3,7 @@ Browse indexed chunks
 """
 
 import os
+import re
 import streamlit as st
 from datetime import datetime
 from qdrant_client import QdrantClient
@@ -15,6 +16,11 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
 QDRANT_URL = os.getenv('QDRANT_URL', 'http://localhost:6333')
 COLLECTION_NAME = 'imessage_chunks'
 
+# Precompiled prefix matchers for message coloring: one C-level regex pass
+# over the whole chunk instead of a Python loop per line on every rerun
+_ME_RE = re.compile(r'^\[Me ', re.M)
+_OTHER_RE = re.compile(r'^\[(?!Me )', re.M)
+
 st.set_page_config(
     page_title="Browse Chunks",
     page_icon="📚",
@@ -171,17 +177,10 @@ try:
                 
                 st.divider()
                 
-                # Format messages with colors
+                # Format messages with colors; st.code keeps the text literal
                 text = payload.get('text', '')
-                lines = text.split('\n')
-                
-                for line in lines:
-                    if line.startswith('[Me '):
-                        st.markdown(f"🟢 `{line}`")
-                    elif line.startswith('['):
-                        st.markdown(f"🔵 `{line}`")
-                    elif line.strip():
-                        st.text(line)
+                formatted = _OTHER_RE.sub('🔵 [', _ME_RE.sub('🟢 [Me ', text))
+                st.code(formatted, language=None)
 
 except Exception as e:
     st.error(f"Error fetching chunks: {e}")